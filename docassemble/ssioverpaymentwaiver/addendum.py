@@ -4,40 +4,48 @@ import mimetypes
 from typing import Any, Dict, List, Union, Callable
 from docassemble.base.util import log, word, DADict, DAList, DAObject, DAFile, DAFileCollection, DAFileList, defined, value, pdf_concatenate, zip_file, DAOrderedDict, action_button_html, include_docx_template, user_logged_in, user_info, send_email, docx_concatenate, get_config, space_to_underscore, DAStaticFile, alpha, currency
 
+_NEWLINE_RE = re.compile(r"[\r\n]+|\r+|\n+")
+_HTML_SAFE_RE = re.compile(r'[^A-Za-z0-9]+')
+
+_MISSING = object()
+
 def label(dictionary):
-  try:
-    return list(dictionary.items())[0][1]
-  except:
+  if not isinstance(dictionary, (dict, DADict)):
     return ''
+  return next(iter(dictionary.items()), ('', ''))[1]
 
 def key(dictionary):
-  try:
-    return list(dictionary.items())[0][0]
-  except:
+  if not isinstance(dictionary, (dict, DADict)):
     return ''
+  return next(iter(dictionary.items()), ('', ''))[0]
 
 def safeattr(object, key):
-  try:
-    if isinstance(object, dict) or isinstance(object, DADict):
-      return str(object.get(key,''))
-    elif isinstance(object, DAObject):
-      # `location` is not an attribute people usually want shown in the table of people's attributes
-      if key == 'location':
+  if isinstance(object, (dict, DADict)):
+    return str(object.get(key,''))
+  elif isinstance(object, DAObject):
+    # `location` is not an attribute people usually want shown in the table of people's attributes
+    if key == 'location':
+      return ''
+    # Reading an attribute or converting it to a string can raise the NameError
+    # or IndexError docassemble uses to gather variables; never trigger that here
+    try:
+      attr = getattr(object, key, _MISSING)
+      if attr is _MISSING:
         return ''
       # At least for this form assume floats should be formatted as currency values
-      if isinstance(getattr(object, key), float):
-        return currency(getattr(object, key))
-      return str(getattr(object, key))
-    else:
+      if isinstance(attr, float):
+        return currency(attr)
+      return str(attr)
+    except Exception:
       return ''
-  except:
+  else:
     return ''
 
 def html_safe_str(the_string: str) -> str:
   """
   Return a string that can be used as an html class or id
   """
-  return re.sub( r'[^A-Za-z0-9]+', '_', the_string )
+  return _HTML_SAFE_RE.sub('_', the_string)
 
 
 class ALAddendumField(DAObject):
@@ -68,13 +76,18 @@ class ALAddendumField(DAObject):
 
     # If trigger is not a boolean value, overflow value is the value that starts at the end of the safe value.
     original_value = self.value_if_defined()
+    # Always get rid of double newlines, for consistency with safe_value.
+    # Computed once here and shared with safe_value to avoid a second regex pass.
+    if isinstance(original_value, str):
+      value_to_process = _NEWLINE_RE.sub(r"\n",original_value).rstrip()
+    else:
+      value_to_process = None
     safe_text = self.safe_value(overflow_message = overflow_message, 
                                 input_width=input_width, 
                                 preserve_newlines=preserve_newlines, 
-                                _original_value = original_value)
+                                _original_value = original_value,
+                                _collapsed = value_to_process)
     if isinstance(safe_text,str):
-      # Always get rid of double newlines, for consistency with safe_value.
-      value_to_process = re.sub(r"[\r\n]+|\r+|\n+",r"\n",original_value).rstrip()
       if safe_text == value_to_process: # no overflow
         return ""
       # If this is a string, the safe value will include an overflow message. Delete
@@ -91,6 +104,22 @@ class ALAddendumField(DAObject):
     # Do not subtract length of overflow message if this is a list of objects instead of a string
     return original_value[self.overflow_trigger:]
 
+  def has_overflow(self) -> bool:
+    """
+    Return True if the field has any overflow content. Avoids building the
+    overflow value when a simple length check is enough to decide.
+    """
+    if isinstance(self.overflow_trigger, bool) and self.overflow_trigger:
+      return bool(self.value())
+
+    value = self.value_if_defined()
+    # Same early return as safe_value(): short text with no newlines never overflows
+    if isinstance(value, str) and len(value) <= self.overflow_trigger and (value.count('\r') + value.count('\n')) == 0:
+      return False
+    if isinstance(value, (list, DAList)):
+      return len(value) > self.overflow_trigger
+    return bool(self.overflow_value())
+
   def max_lines(self, input_width:int=80, overflow_message_length=0) -> int:
     """
     Estimate the number of rows in the field in the output document.
@@ -105,7 +134,7 @@ class ALAddendumField(DAObject):
     """
     return self.value_if_defined()
 
-  def safe_value(self, overflow_message:str="", input_width:int=80, preserve_newlines:bool=False, _original_value=None):
+  def safe_value(self, overflow_message:str="", input_width:int=80, preserve_newlines:bool=False, _original_value=None, _collapsed=None):
     """
     Try to return just the portion of the variable
     that is _shorter than_ the overflow trigger. Otherwise, return empty string.
@@ -118,6 +147,9 @@ class ALAddendumField(DAObject):
         _original_value (Any): for speed reasons, you can provide the full text and just use this
             method to determine if the overflow trigger is exceeded. If no _original_value is
             provided, this method will determine it using the value_if_defined() method.
+        _collapsed (str): for speed reasons, you can provide the text with every run of newline
+            characters already collapsed to a single \\n and trailing whitespace stripped.
+            If not provided, this method will compute it from the value.
     """
 
     # Handle simplest case first
@@ -128,6 +160,10 @@ class ALAddendumField(DAObject):
     if isinstance(value, str) and len(value) <= self.overflow_trigger and (value.count('\r') + value.count('\n')) == 0:
       return value
 
+    if isinstance(value, str) and _collapsed is None:
+      # Replace all new line characters with just \n. \r\n inserts two lines in a PDF
+      _collapsed = _NEWLINE_RE.sub(r"\n",value).rstrip()
+
     max_lines = self.max_lines(input_width=input_width,overflow_message_length=len(overflow_message))
     max_chars = max(self.overflow_trigger - len(overflow_message),0)
 
@@ -135,28 +171,30 @@ class ALAddendumField(DAObject):
     # each line will be at least input_width wide
     if preserve_newlines and max_lines > 1:
       if isinstance(value, str):
-        # Replace all new line characters with just \n. \r\n inserts two lines in a PDF
-        value = re.sub(r"[\r\n]+|\r+|\n+",r"\n",value).rstrip()
+        value = _collapsed
         line = 1
-        retval = ""
+        parts = []
         paras = value.split('\n')
         para = 0
         while line <= max_lines and para < len(paras):
           # add the whole paragraph if less than width of input
           if len(paras[para]) <= input_width:
-            retval += paras[para] + "\n"
+            parts.append(paras[para] + "\n")
             line += 1
             para += 1
           else:
-            # Keep taking the first input_width characters until we hit max_lines
-            # or we finish the paragraph
-            while line <= max_lines and len(paras[para]):
-              retval += paras[para][:input_width]
-              paras[para] = paras[para][input_width:]
+            # Keep taking the next input_width characters until we hit max_lines
+            # or we finish the paragraph. Track our position with an offset
+            # instead of re-slicing the paragraph on each line.
+            pos = 0
+            while line <= max_lines and pos < len(paras[para]):
+              parts.append(paras[para][pos:pos+input_width])
+              pos += input_width
               line += 1
-            if not len(paras[para]):
+            if pos >= len(paras[para]):
               para += 1
-              retval += "\n"
+              parts.append("\n")
+        retval = "".join(parts)
         # TODO: check logic here to only add overflow message when we exceed length
         if len(paras) > para:
           return retval.rstrip() + overflow_message # remove trailing newline before adding overflow message
@@ -165,13 +203,15 @@ class ALAddendumField(DAObject):
 
     # Strip newlines from strings
     if isinstance(value, str):
+      # Each newline run is already a single \n, so a plain replace gives the same result as a regex pass
+      collapsed = _collapsed.replace("\n", " ")
       if len(value) > self.overflow_trigger:
-        return re.sub(r"[\r\n]+|\r+|\n+"," ",value).rstrip()[:max_chars] + overflow_message
+        return collapsed[:max_chars] + overflow_message
       else:
-        return re.sub(r"[\r\n]+|\r+|\n+"," ",value).rstrip()[:max_chars]
+        return collapsed[:max_chars]
 
     # If the overflow item is a list or DAList
-    if isinstance(value, list) or isinstance(value, DAList):
+    if isinstance(value, (list, DAList)):
       return value[:self.overflow_trigger]
     else:
       # We can't slice objects that are not lists or strings
@@ -181,11 +221,39 @@ class ALAddendumField(DAObject):
     """
     Return the value of the field if it is defined, otherwise return an empty string.
     Addendum should never trigger docassemble's variable gathering.
+    Once the field is defined, its value is cached until invalidate_cache() is
+    called or the interview answers are saved at the end of the request. An
+    undefined field is not cached, so a later assembly pass in the same request
+    sees the value as soon as it is defined.
     """
+    if hasattr(self, '_resolved_cache'):
+      return self._resolved_cache
     if defined(self.field_name):
-      return value(self.field_name)
+      self._resolved_cache = value(self.field_name)
+      return self._resolved_cache
     return ""
 
+  def invalidate_cache(self) -> None:
+    """
+    Forget the value cached by value_if_defined() and the kind cached by type(),
+    e.g. if the underlying variable is reassigned during the same request.
+    """
+    if hasattr(self, '_resolved_cache'):
+      del self._resolved_cache
+    if hasattr(self, '_kind'):
+      del self._kind
+
+  def __getstate__(self):
+    # Never save the cached value or kind with the interview answers, so they
+    # cannot go stale between page loads.
+    if hasattr(super(), '__getstate__'):
+      state = dict(super().__getstate__())
+    else:
+      state = dict(self.__dict__)
+    state.pop('_resolved_cache', None)
+    state.pop('_kind', None)
+    return state
+
   def __str__(self):
     return str(self.value_if_defined())
 
@@ -198,38 +266,46 @@ class ALAddendumField(DAObject):
       return self.headers
     else:
       # Use the first row as an exemplar
-      try:
-        first_value = self.value_if_defined()[0]
-
-        if isinstance(first_value, dict) or isinstance(first_value, DADict):
-          return list([{key:key} for key in first_value.keys()])
-        elif isinstance(first_value, DAObject):
-          attr_to_ignore = {'has_nonrandom_instance_name','instanceName','attrList'}
-          if skip_empty_attributes:
-            return [{key:key} for key in list( set(first_value.__dict__.keys()) - set(skip_attributes) - attr_to_ignore ) if safeattr(first_value, key)]
-          else:
-            return [{key:key} for key in list( set(first_value.__dict__.keys()) - set(skip_attributes) - attr_to_ignore )]
-      except:
+      if self.type() != 'object_list':
         return None
+      first_value = self.value_if_defined()[0]
+
+      if isinstance(first_value, (dict, DADict)):
+        return list([{key:key} for key in first_value.keys()])
+      elif isinstance(first_value, DAObject):
+        attr_to_ignore = {'has_nonrandom_instance_name','instanceName','attrList'}
+        if skip_empty_attributes:
+          return [{key:key} for key in list( set(first_value.__dict__.keys()) - set(skip_attributes) - attr_to_ignore ) if safeattr(first_value, key)]
+        else:
+          return [{key:key} for key in list( set(first_value.__dict__.keys()) - set(skip_attributes) - attr_to_ignore )]
       # None means the value has no meaningful columns we can extract
 
 
   def type(self) -> str:
     """
     list | object_list | other
+    The result is cached only once value_if_defined() has cached a real value,
+    and not for an empty list, whose kind can change as it is gathered.
     """
+    if hasattr(self, '_kind'):
+      return self._kind
     value = self.value_if_defined()
-    if isinstance(value, list) or isinstance(value, DAList):
-      if len(value) and (isinstance(value[0], dict) or isinstance(value[0], DADict) or isinstance(value[0], DAObject)):
-        return "object_list"
-      return "list"
-    return "other"
+    if isinstance(value, (list, DAList)):
+      if len(value) and isinstance(value[0], (dict, DADict, DAObject)):
+        kind = "object_list"
+      else:
+        kind = "list"
+    else:
+      kind = "other"
+    if hasattr(self, '_resolved_cache') and not (kind == "list" and not len(value)):
+      self._kind = kind
+    return kind
 
   def is_list(self) -> bool:
     """
     Identify whether the field is a list, whether of objects/dictionaries or just plain variables.
     """
-    return self.type() == 'object_list' or self.type() == 'list'
+    return self.type() in ('object_list', 'list')
 
   def is_object_list(self) -> bool:
     """
@@ -244,7 +320,8 @@ class ALAddendumField(DAObject):
     but you also do not need to use this output if you want to independently control the format
     of the table.
     """
-    if not self.columns():
+    cols = self.columns()
+    if not cols:
       if self.overflow_value():
         retval = "* "
         retval += "\n* ".join(self.overflow_value())
@@ -252,23 +329,21 @@ class ALAddendumField(DAObject):
       else:
         return ""
 
-    num_columns = len(self.columns())
+    num_columns = len(cols)
 
-    header = " | ".join([list(item.items())[0][1] for item in self.columns()])
+    # Each column is a single-entry {attribute: label} dict
+    pairs = [next(iter(column.items())) for column in cols]
+    header = " | ".join([pair[1] for pair in pairs])
     header += "\n"
     header += "|".join(["-----"] * num_columns)
 
-    flattened_columns = []
-    for column in self.columns():
-      flattened_columns.append(list(column.items())[0][0])
+    flattened_columns = [pair[0] for pair in pairs]
 
-    rows = "\n"
+    row_chunks = []
     for row in self.overflow_value():
-      if isinstance(row, dict) or isinstance(row, DADict):
-        row_values = []
-        for column in flattened_columns:
-          row_values.append(str(row.get(column,'')))
-        rows += "|".join(row_values)
+      # Decide once per row how to read a cell, rather than once per column
+      if isinstance(row, (dict, DADict)):
+        row_values = [str(row.get(column,'')) for column in flattened_columns]
       else:
         row_values = []
         for column in flattened_columns:
@@ -276,10 +351,10 @@ class ALAddendumField(DAObject):
           # to a string
           try:
             row_values.append(str(getattr(row, column,'')))
-          except:
+          except Exception:
             row_values.append("")
-        rows += "|".join(row_values)
-      rows += "\n"
+      row_chunks.append("|".join(row_values) + "\n")
+    rows = "\n" + "".join(row_chunks)
 
     return header + rows
 
@@ -334,7 +409,7 @@ class ALAddendumFieldDict(DAOrderedDict):
     If the "style" is set to overflow_only, only return the overflow values.
     """
     if style == 'overflow_only':
-      return [field for field in self.values() if len(field.overflow_value())]
+      return [field for field in self.values() if field.has_overflow()]
     else:
       return [field for field in self.values() if defined(field.field_name)]
 
@@ -347,6 +422,6 @@ class ALAddendumFieldDict(DAOrderedDict):
       bool: True if at least 1 field has "overflow" content, False otherwise.
     """
     for field in self.values():
-      if field.overflow_value():
+      if field.has_overflow():
         return True
     return False      
\ No newline at end of file
@@ -14,5 +14,5 @@ def thousands(num:float) -> str:
   """
   try:
     return f"{int(num):,}"
-  except:
+  except (TypeError, ValueError, OverflowError):
     return num
\ No newline at end of file
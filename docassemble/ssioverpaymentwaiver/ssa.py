@@ -1,7 +1,12 @@
 from docassemble.base.functions import defined, value
 from docassemble.base.util import validation_error, Address, DAEmpty, DAObject, DAList, Person, title_case, log
-import re
 import requests
+from requests.adapters import HTTPAdapter
+from functools import lru_cache
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 def optional(field: str):
     """Returns the value of the field, if it exists, otherwise empty"""
@@ -9,12 +14,49 @@ def optional(field: str):
 
 def is_valid_ssn(x):
     """Validates that the field is 3 digits, a hyphen, 2 digits, a hyphen, and 4 final digits only."""
-    #return True # speed up testing
-    valid_ssn=re.compile(r'^\d{3}-\d{2}-\d{4}$')
-    if not bool(re.match(valid_ssn,x)):
+    # A plain length/slice check is cheaper than a regex for this fixed shape
+    if not (len(x) == 11 and x[3] == '-' and x[6] == '-'
+            and x[:3].isdecimal() and x[4:6].isdecimal() and x[7:].isdecimal()):
         validation_error("Write the Social Security Number like this: XXX-XX-XXXX")
     return True
 
+_FIELD_OFFICE_URL = "https://services6.arcgis.com/zFiipv75rloRP5N4/ArcGIS/rest/services/SSA_Field_Office_Information/FeatureServer/0/query"
+
+# Reuse connections to ArcGIS across the retries in FieldOfficeList.load_offices
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+@lru_cache(maxsize=256)
+def _fetch_offices(latitude, longitude, distance):
+    """Query ArcGIS for offices near the point and return (url, GeoJSON).
+
+    Cached, so the distance-doubling retries in FieldOfficeList.load_offices and
+    re-renders of the same page do not repeat the request. Raises ValueError
+    instead of returning a bad response so that failures are not cached.
+    """
+    # Only send the parameters the service needs; the rest use ArcGIS defaults
+    params = {
+        'geometry': str(longitude) + ',' + str(latitude),
+        'distance': distance,
+        'geometryType': 'esriGeometryPoint',
+        'inSR': 4326, # See https://developers.arcgis.com/documentation/core-concepts/spatial-references/
+        'outSR': 4326,
+        'spatialRel': 'esriSpatialRelIntersects',
+        'units': 'esriSRUnit_StatuteMile',
+        'outFields': '*',
+        'returnGeometry': 'true',
+        'f': 'pgeojson',
+    }
+
+    r = _SESSION.get(_FIELD_OFFICE_URL, params=params, timeout=(3.05, 10))
+
+    # orjson.JSONDecodeError is a ValueError, same as r.json()
+    jdata = orjson.loads(r.content) if orjson else r.json()
+    # Check if the JSON response contains expected keys
+    if 'features' not in jdata:
+        raise ValueError(f"Unexpected JSON structure: {jdata}")
+    return r.url, jdata
+
 class FieldOffice(Person):
     def init(self, *pargs, **kwargs):
         super(FieldOffice, self).init(*pargs, **kwargs)
@@ -40,30 +82,36 @@ class FieldOfficeList(DAList):
         loop = 1
         max_loop = 9
 
-        try:
-            # Keep expanding the search radius if we didn't get enough matches in the default distance
-            while loop < max_loop and len(results['features']) < number:
-                distance *= 2
-                results = self.searcher.nearest_offices(address, distance=distance)
-                loop += 1
-        except:
+        # nearest_offices returns None if the address can't be located or the search fails;
+        # otherwise the results always have a 'features' key
+        if results is None:
             return None
+        # Keep expanding the search radius if we didn't get enough matches in the default distance
+        while loop < max_loop and len(results['features']) < number:
+            distance *= 2
+            results = self.searcher.nearest_offices(address, distance=distance)
+            if results is None:
+                return None
+            loop += 1
 
 
         for item in results['features']:
             try:
+              props = item['properties']
               fo = self.appendObject()
-              fo.name.text = title_case(item['properties']['ADDRESS_LINE_1'])
-              fo.title = title_case(item['properties']['OFFICE_NAME'])
-              fo.address.address = title_case(item['properties']['ADDRESS_LINE_3'])
-              if item['properties']['ADDRESS_LINE_2']:
-                  fo.address.unit = title_case(item['properties']['ADDRESS_LINE_2'])
-              fo.address.city = title_case(item['properties']['CITY'])
-              fo.address.state = item['properties']['STATE']
-              fo.address.zip = item['properties']['ZIP_CODE']
-              fo.office_code = item['properties']['OFFICE_CODE']
-              fo.phone_number = item['properties']['PHONE']
-            except:
+              fo.name.text = title_case(props['ADDRESS_LINE_1'])
+              fo.title = title_case(props['OFFICE_NAME'])
+              fo.address.address = title_case(props['ADDRESS_LINE_3'])
+              if props['ADDRESS_LINE_2']:
+                  fo.address.unit = title_case(props['ADDRESS_LINE_2'])
+              fo.address.city = title_case(props['CITY'])
+              # State, ZIP, office code and phone are used as-is
+              fo.address.state = props['STATE']
+              fo.address.zip = props['ZIP_CODE']
+              fo.office_code = props['OFFICE_CODE']
+              fo.phone_number = props['PHONE']
+            except (KeyError, TypeError, AttributeError):
+              # Skip offices with missing or malformed properties
               pass
             
         self.gathered = True
@@ -76,65 +124,11 @@ class FieldOfficeSearcher(DAObject):
     #@staticmethod
     def nearest_offices_by_lat_lng(self, latitude, longitude, distance=5):
         """Search for nearby SSA offices, and return raw GeoJSON results"""
-        url =   "https://services6.arcgis.com/zFiipv75rloRP5N4/ArcGIS/rest/services/SSA_Field_Office_Information/FeatureServer/0/query"
-        
-        params = {
-            'geometry': str(longitude) + ',' + str(latitude),
-            'distance': distance,
-            'geometryType': 'esriGeometryPoint',
-            'inSR': 4326, # See https://developers.arcgis.com/documentation/core-concepts/spatial-references/
-            'outSR': 4326,
-            'spatialRel': 'esriSpatialRelIntersects',
-            'resultType': 'none',
-            'units': 'esriSRUnit_StatuteMile',
-            'returnGeodetic': 'false',
-            'outFields': '*',
-            'returnGeometry': 'true',
-            'multipatchOption': 'xyFootprint',
-            'applyVCSProjection': 'false',
-            'returnIdsOnly': 'false',
-            'returnUniqueIdsOnly': 'false',
-            'returnExtentOnly': 'false',
-            'returnDistinctValues': 'false',
-            'returnZ': 'false',
-            'returnM': 'false',
-            'returnExceededLimitFeatures': 'true',
-            'sqlFormat': 'none',
-            'f': 'pgeojson',
-            'quantizationParameters': '',
-            'where': '',
-            'objectIds': '',
-            'time': '',
-            'maxAllowableOffset': '', 
-            'geometryPrecision': '',
-            'datumTransformation': '',
-            'orderByFields': '',
-            'groupByFieldsForStatistics': '',
-            'outStatistics': '',
-            'having': '',
-            'resultOffset': '',
-            'resultRecordCount': '',
-            'token': ''
-        }
-        
-        r = requests.get(url, params=params)
-
-        self.url = r.url
-        # log(r.url)
-        # return {}
-
-        # TODO: make this safe if API is offline
-        
         try:
-            jdata = r.json()
-            # Check if the JSON response contains expected keys
-            if 'features' in jdata:
-                return jdata
-            else:
-                log("Unexpected JSON structure:", jdata)
-                return None
-        except ValueError as e:
-            log(f"JSON decoding failed: {e}")
+            # Round to ~10 meters so nearby lookups share a cache entry
+            self.url, jdata = _fetch_offices(round(latitude, 4), round(longitude, 4), int(distance))
+        except (ValueError, requests.RequestException) as e:
+            log(f"Field office search failed: {e}")
             return None
         return jdata
 
@@ -9,38 +9,44 @@ standard_exclude_directories = ('.*', 'CVS', '_darcs', './build', './dist', 'EGG
 
 def find_package_data(where='.', package='', exclude=standard_exclude, exclude_directories=standard_exclude_directories):
     out = {}
+    # Lowercase the patterns once rather than on every comparison
+    exclude = [(pattern, pattern.lower()) for pattern in exclude]
+    exclude_directories = [(pattern, pattern.lower()) for pattern in exclude_directories]
     stack = [(convert_path(where), '', package)]
     while stack:
-        where, prefix, package = stack.pop(0)
-        for name in os.listdir(where):
-            fn = os.path.join(where, name)
-            if os.path.isdir(fn):
-                bad_name = False
-                for pattern in exclude_directories:
-                    if (fnmatchcase(name, pattern)
-                        or fn.lower() == pattern.lower()):
-                        bad_name = True
-                        break
-                if bad_name:
-                    continue
-                if os.path.isfile(os.path.join(fn, '__init__.py')):
-                    if not package:
-                        new_package = name
+        where, prefix, package = stack.pop()
+        with os.scandir(where) as entries:
+            for entry in entries:
+                name = entry.name
+                fn = entry.path
+                fn_lc = fn.lower()
+                if entry.is_dir():
+                    bad_name = False
+                    for pattern, pattern_lc in exclude_directories:
+                        if (fnmatchcase(name, pattern)
+                            or fn_lc == pattern_lc):
+                            bad_name = True
+                            break
+                    if bad_name:
+                        continue
+                    if os.path.isfile(os.path.join(fn, '__init__.py')):
+                        if not package:
+                            new_package = name
+                        else:
+                            new_package = package + '.' + name
+                            stack.append((fn, '', new_package))
                     else:
-                        new_package = package + '.' + name
-                        stack.append((fn, '', new_package))
+                        stack.append((fn, prefix + name + '/', package))
                 else:
-                    stack.append((fn, prefix + name + '/', package))
-            else:
-                bad_name = False
-                for pattern in exclude:
-                    if (fnmatchcase(name, pattern)
-                        or fn.lower() == pattern.lower()):
-                        bad_name = True
-                        break
-                if bad_name:
-                    continue
-                out.setdefault(package, []).append(prefix+name)
+                    bad_name = False
+                    for pattern, pattern_lc in exclude:
+                        if (fnmatchcase(name, pattern)
+                            or fn_lc == pattern_lc):
+                            bad_name = True
+                            break
+                    if bad_name:
+                        continue
+                    out.setdefault(package, []).append(prefix+name)
     return out
 
 setup(name='docassemble.ssioverpaymentwaiver',